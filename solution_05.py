@@ -1,25 +1,131 @@
+import collections
 import heapq
 import itertools
 import math
-import queue
 import random
 import time
 import csv
 from typing import TypeVar, Callable, Tuple, \
-    List, Set, Dict, Optional
+    List, Set, FrozenSet, Dict, Optional, Iterable
 
 import numpy as np
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional; searches fall back to pure Python
+    NUMBA_AVAILABLE = False
+
 T = TypeVar('T')
 Matrix = TypeVar('Matrix')  # Adjacency Matrix
 Vertex = TypeVar('Vertex')  # Vertex Class Instance
 Graph = TypeVar('Graph')  # Graph Class Instance
+CSR = Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, int], List[str]]  # indptr, indices, weights, id2idx, idx2id
+
+
+def _heap_less(heap: np.ndarray, a: int, b: int) -> bool:
+    """
+    Orders rows (priority, counter, vertex) of an array-backed heap by priority, then insertion counter
+    """
+    return heap[a, 0] < heap[b, 0] or (heap[a, 0] == heap[b, 0] and heap[a, 1] < heap[b, 1])
+
+
+def _heap_swap(heap: np.ndarray, a: int, b: int) -> None:
+    """
+    Swaps two rows of an array-backed heap in place
+    """
+    for col in range(3):
+        heap[a, col], heap[b, col] = heap[b, col], heap[a, col]
+
+
+def _astar_kernel(indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray, h: np.ndarray,
+                  src: int, dst: int) -> Tuple[np.ndarray, float, np.ndarray]:
+    """
+    A* Search over a graph in CSR form using integer vertex indices; compiled with numba when available
+    :param indptr: edges of vertex u are indices[indptr[u]:indptr[u + 1]]
+    :param indices: destination vertex index of every edge
+    :param weights: weight of every edge
+    :param h: heuristic estimate from every vertex to dst
+    :param src: index of the starting vertex.
+    :param dst: index of the terminating vertex.
+    :return: (path, distance, expanded): vertex indices from src to dst (empty if unreachable),
+    the path cost, and a mask of vertices popped from the open set
+    """
+    n = indptr.shape[0] - 1
+    dist = np.full(n, np.inf)
+    pred = np.full(n, -1, np.int64)
+    expanded = np.zeros(n, np.bool_)
+
+    heap = np.empty((indices.shape[0] + 1, 3), np.float64)  # rows of (priority, counter, vertex)
+    heap[0, 0], heap[0, 1], heap[0, 2] = h[src], 0.0, src
+    size, counter = 1, 1.0
+    dist[src] = 0.0
+    found = False
+
+    while size > 0:
+        priority, node = heap[0, 0], int(heap[0, 2])
+        size -= 1
+        heap[0, 0], heap[0, 1], heap[0, 2] = heap[size, 0], heap[size, 1], heap[size, 2]
+        i = 0
+        while 2 * i + 1 < size:  # sift the moved row down
+            child = 2 * i + 1
+            if child + 1 < size and _heap_less(heap, child + 1, child):
+                child += 1
+            if not _heap_less(heap, child, i):
+                break
+            _heap_swap(heap, i, child)
+            i = child
+
+        if priority > dist[node] + h[node]:
+            continue  # stale entry, vertex was re-pushed with a lower cost
+        expanded[node] = True
+        if node == dst:
+            found = True
+            break
+
+        for e in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[e]
+            possible_path = dist[node] + weights[e]
+            if possible_path < dist[neighbor]:
+                dist[neighbor] = possible_path
+                pred[neighbor] = node
+                if size == heap.shape[0]:
+                    grown = np.empty((2 * size, 3), np.float64)
+                    grown[:size] = heap
+                    heap = grown
+                i = size
+                heap[i, 0], heap[i, 1], heap[i, 2] = possible_path + h[neighbor], counter, neighbor
+                size += 1
+                counter += 1.0
+                while i > 0 and _heap_less(heap, i, (i - 1) // 2):  # sift the new row up
+                    _heap_swap(heap, i, (i - 1) // 2)
+                    i = (i - 1) // 2
+
+    if not found:
+        return np.empty(0, np.int64), 0.0, expanded
+
+    length, node = 1, dst
+    while node != src:
+        node = pred[node]
+        length += 1
+    path = np.empty(length, np.int64)
+    node = dst
+    for i in range(length - 1, -1, -1):
+        path[i] = node
+        node = pred[node]
+    return path, dist[dst], expanded
+
+
+if NUMBA_AVAILABLE:
+    _heap_less = njit(cache=True)(_heap_less)
+    _heap_swap = njit(cache=True)(_heap_swap)
+    _astar_kernel = njit(cache=True)(_astar_kernel)
 
 
 class Vertex:
     """ Class representing a Vertex object within a Graph """
 
-    __slots__ = ['id', 'adj', 'visited', 'x', 'y']
+    __slots__ = ['id', 'idx', 'adj', 'visited', 'x', 'y']
 
     def __init__(self, id_init: str, x: float = 0, y: float = 0) -> None:
         """
@@ -29,6 +135,7 @@ class Vertex:
         :param y: The y coordinate of this vertex (used in a_star)
         """
         self.id = id_init
+        self.idx = -1  # dense integer index assigned by Graph.get_vertex_index, -1 until then
         self.adj = {}  # dictionary {id : weight} of outgoing edges
         self.visited = False  # boolean flag used in search algorithms
         self.x, self.y = x, y  # coordinates for use in metric computations
@@ -41,6 +148,18 @@ class Vertex:
         """
         if self.id != other.id:
             return False
+        return (self.visited == other.visited and self.x == other.x and self.y == other.y
+                and self.adj == other.adj)
+
+    def debug_equal(self, other: Vertex) -> bool:
+        """
+        Same comparison as ==, but prints the first difference found; used when debugging unit tests.
+        :param other: [Vertex] vertex to compare.
+        :return: [bool] True if vertices are equal, else False.
+        """
+        if self.id != other.id:
+            print(f"Vertex ids not equal: self.id='{self.id}', other.id='{other.id}'")
+            return False
         if self.visited != other.visited:
             print(f"Vertex '{self.id}' not equal")
             print(f"Vertex visited flags not equal: self.visited={self.visited},"
@@ -54,11 +173,12 @@ class Vertex:
             print(f"Vertex '{self.id}' not equal")
             print(f"Vertex y coords not equal: self.y={self.y}, other.y={other.y}")
             return False
-        if set(self.adj.items()) != set(other.adj.items()):
-            diff = set(self.adj.items()).symmetric_difference(set(other.adj.items()))
+        if self.adj != other.adj:
             print(f"Vertex '{self.id}' not equal")
-            print(f"Vertex adj dictionaries not equal:"
-                  f" symmetric diff of adjacency (k,v) pairs = {str(diff)}")
+            if __debug__:
+                diff = set(self.adj.items()).symmetric_difference(other.adj.items())
+                print(f"Vertex adj dictionaries not equal:"
+                      f" symmetric diff of adjacency (k,v) pairs = {str(diff)}")
             return False
         return True
 
@@ -99,7 +219,7 @@ class Vertex:
         :param other: [Vertex] Other Vertex to which we wish to compute distance.
         :return: [float] Euclidean distance between this Vertex and another Vertex.
         """
-        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
+        return math.hypot(self.x - other.x, self.y - other.y)
 
     def taxicab_distance(self, other: Vertex) -> float:
         """
@@ -113,7 +233,8 @@ class Vertex:
 class Graph:
     """ Class implementing the Graph ADT using an Adjacency Map structure """
 
-    __slots__ = ['size', 'vertices', 'plot_show', 'plot_delay']
+    __slots__ = ['size', 'vertices', 'plot_show', 'plot_delay', '_reverse_adj', '_idx', '_csr',
+                 '_edges_cache', '_verts_cache']
 
     def __init__(self, plt_show: bool = False, matrix: Matrix = None, csvf: str = "") -> None:
         """
@@ -122,14 +243,18 @@ class Graph:
         :param: matrix : optional matrix parameter used for fast construction
         :param: csvf : optional filepath to a csv containing a matrix
         """
-        matrix = matrix if matrix else np.loadtxt(csvf, delimiter=',', dtype=str).tolist() if csvf else None
         self.size = 0
         self.vertices = {}
+        self._reverse_adj = None  # cached {end_id: [(begin_id, weight)]}, reset on mutation
+        self._idx = None  # cached {vertex_id: integer index}, reset when a vertex is added
+        self._csr = None  # cached CSR arrays, reset on mutation
+        self._edges_cache = None  # cached result of get_all_edges, reset on mutation
+        self._verts_cache = None  # cached result of get_all_vertices, reset on mutation
 
         self.plot_show = plt_show
         self.plot_delay = 0.2
 
-        if matrix is not None:
+        if matrix:
             for i in range(1, len(matrix)):
                 for j in range(1, len(matrix)):
                     if matrix[i][j] == "None" or matrix[i][j] == "":
@@ -137,12 +262,27 @@ class Graph:
                     else:
                         matrix[i][j] = float(matrix[i][j])
             self.matrix2graph(matrix)
+        elif csvf:
+            self.csv2graph(csvf)
 
     def __eq__(self, other: Graph) -> bool:
         """
         Overloads equality operator for Graph class
         :param other: graph to compare
         """
+        if self.size != other.size or len(self.vertices) != len(other.vertices):
+            return False
+        for vertex_id, vertex in self.vertices.items():
+            other_vertex = other.get_vertex_by_id(vertex_id)
+            if other_vertex is None or vertex.adj != other_vertex.adj:
+                return False
+        return True
+
+    def debug_equal(self, other: Graph) -> bool:
+        """
+        Same comparison as ==, but prints the first difference found; used when debugging unit tests
+        :param other: graph to compare
+        """
         if self.size != other.size or len(self.vertices) != len(other.vertices):
             print(f"Graph size not equal: self.size={self.size}, other.size={other.size}")
             return False
@@ -153,13 +293,11 @@ class Graph:
                     print(f"Vertices not equal: '{vertex_id}' not in other graph")
                     return False
 
-                adj_set = set(vertex.adj.items())
-                other_adj_set = set(other_vertex.adj.items())
-
-                if not adj_set == other_adj_set:
+                if vertex.adj != other_vertex.adj:
                     print(f"Vertices not equal: adjacencies of '{vertex_id}' not equal")
-                    print(f"Adjacency symmetric difference = "
-                          f"{str(adj_set.symmetric_difference(other_adj_set))}")
+                    if __debug__:
+                        diff = set(vertex.adj.items()).symmetric_difference(other_vertex.adj.items())
+                        print(f"Adjacency symmetric difference = {str(diff)}")
                     return False
         return True
 
@@ -181,17 +319,20 @@ class Graph:
             import matplotlib.patches as patches
             import matplotlib.pyplot as plt
 
+            edges = self.get_all_edges()
+            verts = self.get_all_vertices()
+
             # if no x, y coords are specified, place vertices on the unit circle
-            for i, vertex in enumerate(self.get_all_vertices()):
+            for i, vertex in enumerate(verts):
                 if vertex.x == 0 and vertex.y == 0:
                     vertex.x = math.cos(i * 2 * math.pi / self.size)
                     vertex.y = math.sin(i * 2 * math.pi / self.size)
 
             # show edges
-            num_edges = len(self.get_all_edges())
-            max_weight = max([edge[2] for edge in self.get_all_edges()]) if num_edges > 0 else 0
+            num_edges = len(edges)
+            max_weight = max([edge[2] for edge in edges]) if num_edges > 0 else 0
             colormap = cm.get_cmap('cool')
-            for i, edge in enumerate(self.get_all_edges()):
+            for i, edge in enumerate(edges):
                 origin = self.get_vertex_by_id(edge[0])
                 destination = self.get_vertex_by_id(edge[1])
                 weight = edge[2]
@@ -212,11 +353,11 @@ class Graph:
                          s=weight, color=colormap(weight / max_weight))
 
             # show vertices
-            x = np.array([vertex.x for vertex in self.get_all_vertices()])
-            y = np.array([vertex.y for vertex in self.get_all_vertices()])
-            labels = np.array([vertex.id for vertex in self.get_all_vertices()])
+            x = np.array([vertex.x for vertex in verts])
+            y = np.array([vertex.y for vertex in verts])
+            labels = np.array([vertex.id for vertex in verts])
             colors = np.array(
-                ['yellow' if vertex.visited else 'black' for vertex in self.get_all_vertices()])
+                ['yellow' if vertex.visited else 'black' for vertex in verts])
             plt.scatter(x, y, s=40, c=colors, zorder=1)
 
             # plot labels
@@ -240,13 +381,16 @@ class Graph:
         :param weight: weight associated with edge from start -> dest
         :return: None
         """
+        self._reverse_adj = self._csr = self._edges_cache = self._verts_cache = None
         if self.vertices.get(begin_id) is None:
             self.vertices[begin_id] = Vertex(begin_id)
             self.size += 1
+            self._idx = None
         if end_id is not None:
             if self.vertices.get(end_id) is None:
                 self.vertices[end_id] = Vertex(end_id)
                 self.size += 1
+                self._idx = None
             self.vertices.get(begin_id).adj[end_id] = weight
 
     def matrix2graph(self, matrix: Matrix) -> None:
@@ -268,6 +412,24 @@ class Graph:
                 if matrix[i][j] is not None:
                     self.add_to_graph(matrix[i][0], matrix[j][0], matrix[i][j])
 
+    def csv2graph(self, csvf: str) -> None:
+        """
+        Given a csv of the form written by graph2csv, construct a graph
+        Weights are parsed numerically by np.loadtxt ("" and "None" become NaN) and only non-empty cells become edges
+        :param csvf: filepath to a csv containing a matrix
+        :return: None
+        """
+        # ids are read as raw strings, exactly as written by graph2csv
+        ids = np.loadtxt(csvf, delimiter=',', dtype=str, usecols=0, skiprows=1, ndmin=1).tolist()
+        weights = np.loadtxt(csvf, delimiter=',', skiprows=1, usecols=range(1, len(ids) + 1), ndmin=2,
+                             converters=lambda cell: np.nan if cell in ("", "None") else float(cell))
+        rows, cols = np.nonzero(~np.isnan(weights))
+
+        for vertex_id in ids:  # add all vertices to begin with
+            self.add_to_graph(vertex_id)
+        for i, j, weight in zip(rows.tolist(), cols.tolist(), weights[rows, cols].tolist()):
+            self.add_to_graph(ids[i], ids[j], weight)
+
     def graph2matrix(self) -> Matrix:
         """
         given a graph, creates an adjacency matrix of the type described in "construct_from_matrix"
@@ -307,12 +469,14 @@ class Graph:
         """
         return self.vertices.get(vertex_id)
 
-    def get_all_vertices(self) -> Set[Vertex]:
+    def get_all_vertices(self) -> FrozenSet[Vertex]:
         """
-        Returns a set of all vertices in the Graph
-        :return: set(Vertex)
+        Returns a set of all vertices in the Graph, cached until the graph is mutated
+        :return: frozenset(Vertex)
         """
-        return set(self.vertices.values())
+        if self._verts_cache is None:
+            self._verts_cache = frozenset(self.vertices.values())
+        return self._verts_cache
 
     def get_edge_by_ids(self, begin_id: str, end_id: str) -> Optional[Tuple[str, str, float]]:
         """
@@ -324,19 +488,119 @@ class Graph:
             weight = self.vertices.get(begin_id).adj.get(end_id)
             return (begin_id, end_id, weight) if weight is not None else None
 
-    def get_all_edges(self) -> Set[Tuple[str, str, float]]:
+    def get_all_edges(self) -> FrozenSet[Tuple[str, str, float]]:
+        """
+        Returns all edges in the graph, cached until the graph is mutated
+        :return: frozenset(tuple(begin_id, end_id, weight)) or empty set if Graph is empty
+        """
+        if self._edges_cache is None:
+            self._edges_cache = frozenset((begin_id, end_id, weight)
+                                          for begin_id, v in self.vertices.items()
+                                          for end_id, weight in v.adj.items())
+        return self._edges_cache
+
+    def get_vertex_index(self) -> Dict[str, int]:
         """
-        Returns all edges in the graph
-        :return: set(tuple(begin_id, end_id, weight)) or empty list if Graph is empty
+        Returns a mapping of vertex id to a dense integer index in [0, size), cached until a vertex is added
+        The index is also stored on each Vertex as vertex.idx
+        :return: dict{vertex_id: index}
         """
-        return {(begin_id, end_id, v.adj[end_id])
-                for begin_id, v in self.vertices.items() for end_id in v.adj}
+        if self._idx is None:
+            self._set_vertex_index({vertex_id: i for i, vertex_id in enumerate(self.vertices)})
+        return self._idx
 
-    def build_path(self, back_edges: Dict[str, str], begin_id: str, end_id: str) -> Tuple[List[str], float]:
+    def _set_vertex_index(self, id2idx: Dict[str, int]) -> None:
         """
-        Given a dictionary of back-edges (a mapping of vertex id to predecessor vertex id),
+        Installs a new vertex id -> index mapping and copies each index onto its Vertex
+        :param id2idx: dict{vertex_id: index}, ordered by index
+        :return: None
+        """
+        for vertex_id, i in id2idx.items():
+            self.vertices[vertex_id].idx = i
+        self._idx = id2idx
+
+    def heuristic_to(self, end_id: str, metric: Callable[[Vertex, Vertex], float]) -> Optional[np.ndarray]:
+        """
+        Computes metric(vertex, end) for every vertex in one vectorized pass
+        Coordinates are read fresh on every call since vertex x, y may be changed after construction
+        :param end_id: id of the target vertex.
+        :param metric: Vertex.euclidean_distance or Vertex.taxicab_distance
+        :return: array of heuristic values ordered by get_vertex_index(), or None if metric is not a built-in
+        """
+        if metric is not Vertex.euclidean_distance and metric is not Vertex.taxicab_distance:
+            return None
+        ordered = [self.vertices[vertex_id] for vertex_id in self.get_vertex_index()]
+        xs = np.fromiter((vertex.x for vertex in ordered), dtype=np.float64, count=self.size)
+        ys = np.fromiter((vertex.y for vertex in ordered), dtype=np.float64, count=self.size)
+        target = self.vertices[end_id]
+        if metric is Vertex.euclidean_distance:
+            return np.hypot(xs - target.x, ys - target.y)
+        return np.abs(xs - target.x) + np.abs(ys - target.y)
+
+    def _build_csr(self) -> CSR:
+        """
+        Builds (and caches until the graph is mutated) a compressed sparse row view of the adjacency map
+        The cache is dropped by every add_to_graph and rebuilt in full, O(V + E) in Python, on the next call;
+        weights written directly to vertex.adj are not picked up until then
+        :return: (indptr, indices, weights, id2idx, idx2id) where the edges of vertex u are
+        indices[indptr[u]:indptr[u + 1]] with matching weights
+        """
+        if self._csr is None:
+            id2idx = self.get_vertex_index()
+            idx2id = list(id2idx)
+            indptr = np.zeros(self.size + 1, dtype=np.int32)
+            indices, weights = [], []
+            for i, vertex_id in enumerate(idx2id):
+                adj = self.vertices[vertex_id].adj
+                indices.extend(id2idx[end_id] for end_id in adj)
+                weights.extend(adj.values())
+                indptr[i + 1] = len(indices)
+            self._csr = (indptr, np.array(indices, dtype=np.int32),
+                         np.array(weights, dtype=np.float64), id2idx, idx2id)
+        return self._csr
+
+    def reorder_for_locality(self) -> CSR:
+        """
+        Relabels vertex indices in breadth-first order so that neighbouring vertices get nearby indices,
+        then rebuilds the CSR arrays. Each BFS starts from the highest-degree vertex not yet labelled.
+        The ordering is kept until a new vertex is added to the graph
+        :return: the rebuilt (indptr, indices, weights, id2idx, idx2id)
+        """
+        order = {}
+        for root in sorted(self.vertices.values(), key=lambda vertex: vertex.deg(), reverse=True):
+            if root.id in order:
+                continue
+            order[root.id] = len(order)
+            q = collections.deque([root])
+            while q:
+                current = q.popleft()
+                for next_id in current.adj:
+                    if next_id not in order:
+                        order[next_id] = len(order)
+                        q.append(self.vertices[next_id])
+
+        self._set_vertex_index(order)
+        self._csr = None
+        return self._build_csr()
+
+    def get_reverse_adj(self) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Returns the incoming edges of every vertex, built once and cached until the graph is mutated
+        :return: dict{end_id: list[tuple(begin_id, weight)]}
+        """
+        if self._reverse_adj is None:
+            reverse_adj = {vertex_id: [] for vertex_id in self.vertices}
+            for begin_id, vertex in self.vertices.items():
+                for end_id, weight in vertex.adj.items():
+                    reverse_adj[end_id].append((begin_id, weight))
+            self._reverse_adj = reverse_adj
+        return self._reverse_adj
+
+    def build_path(self, back_edges: Dict[str, Tuple[str, float]], begin_id: str, end_id: str) -> Tuple[List[str], float]:
+        """
+        Given a dictionary of back-edges (a mapping of vertex id to predecessor vertex id and edge weight),
         reconstruct the path from start_id to end_id and compute the total distance
-        :param back_edges: Dictionary of back-edges, i.e., (key=vertex_id, value=predecessor_vertex_id) pairs
+        :param back_edges: Dictionary of back-edges, i.e., (key=vertex_id, value=(predecessor_vertex_id, weight)) pairs
         :param begin_id: Starting vertex ID string from which to construct path
         :param end_id: Ending vertex ID string to which to construct path
         :return: Tuple where first element is a list of vertex IDs specifying a path from start_id to end_id
@@ -344,8 +608,9 @@ class Graph:
         """
         path, dist = [end_id], 0
         while path[-1] != begin_id:
-            path.append(back_edges.get(path[-1]))  # will construct path in O(V) - no calls to .insert(0)
-            dist += self.get_edge_by_ids(path[-1], path[-2])[2]
+            prev_id, weight = back_edges[path[-1]]
+            path.append(prev_id)  # will construct path in O(V) - no calls to .insert(0)
+            dist += weight
         return list(reversed(path)), dist
 
     def bfs(self, begin_id: str, end_id: str) -> Tuple[List[str], float]:
@@ -359,21 +624,24 @@ class Graph:
         if begin_id not in self.vertices or end_id not in self.vertices:
             return [], 0.0
 
-        q = queue.SimpleQueue()
-        q.put((begin_id, 0))
+        q = collections.deque()
+        q.append((begin_id, 0))
         v = {begin_id}
         back_edges = {}
 
-        while not q.empty():
-            current_id, distance = q.get()
+        # bind lookups used on every edge to locals
+        get, popleft, append, visit = self.vertices.__getitem__, q.popleft, q.append, v.add
+
+        while q:
+            current_id, distance = popleft()
             if current_id == end_id:
                 return self.build_path(back_edges, begin_id, end_id)
 
-            for next_id, weight in self.vertices[current_id].adj.items():
+            for next_id, weight in get(current_id).adj.items():
                 if next_id not in v:
-                    v.add(next_id)
-                    back_edges[next_id] = current_id
-                    q.put((next_id, distance + weight))
+                    visit(next_id)
+                    back_edges[next_id] = (current_id, weight)
+                    append((next_id, distance + weight))
 
         return [], 0.0
 
@@ -387,48 +655,179 @@ class Graph:
         :return: ([path], distance): tuple where first element is a list of vertex IDs specifying a path from begin_id to end_id
         and second element is the sum of the weights of the edges along the path traveled
 
+        With numba installed and a built-in metric, the search runs over the cached CSR arrays (see _build_csr):
+        the first such query after add_to_graph rebuilds them in O(V + E) Python, and weights written directly
+        to vertex.adj are not seen until the next add_to_graph.
         """
         if begin_id not in self.vertices or end_id not in self.vertices:
             return [], 0.0
 
-        open_vertices = PriorityQueue()
-        open_vertices.push(0, self.get_vertex_by_id(begin_id))
+        # built-in metrics are evaluated for all vertices at once rather than per relaxation
+        h_all = self.heuristic_to(end_id, metric)
+        if NUMBA_AVAILABLE and h_all is not None:
+            indptr, indices, weights, id2idx, idx2id = self._build_csr()
+            path, dist, expanded = _astar_kernel(indptr, indices, weights, h_all, id2idx[begin_id], id2idx[end_id])
+            for i in np.flatnonzero(expanded):
+                self.vertices[idx2id[i]].visited = True
+            if not len(path):
+                return [], 0.0
+            # sum the original weights end-to-start, as build_path does, so the distance type and
+            # rounding match the pure-Python search rather than the kernel's float64 total
+            path = [idx2id[i] for i in path]
+            dist = 0
+            for i in range(len(path) - 1, 0, -1):
+                dist += self.vertices[path[i - 1]].adj[path[i]]
+            return path, dist
+
+        # bind lookups used on every relaxation to locals
+        inf, get = math.inf, self.vertices.__getitem__
+        end_vertex, heuristic = get(end_id), metric
+
+        open_vertices = LazyPriorityQueue()
+        push, pop = open_vertices.push, open_vertices.pop
+        push(0, get(begin_id))
 
         old_vertices = {}
 
-        shortest = {}
-        for vertex_id in self.vertices:
-            shortest[vertex_id] = float('inf')
-        shortest[begin_id] = 0
+        # only vertices reached so far are stored; missing entries are treated as infinitely far
+        shortest = {begin_id: 0}
+        costs = {begin_id: heuristic(get(begin_id), end_vertex)}
 
-        costs = {}
-        for vertex_id in self.vertices:
-            costs[vertex_id] = float('inf')
-        costs[begin_id] = metric(self.get_vertex_by_id(begin_id), self.get_vertex_by_id(end_id))
+        h_all = h_all.tolist() if h_all is not None else None
+        h_cache = {}  # custom metric values by vertex id, so revisited vertices are not re-evaluated
 
-        while not open_vertices.empty():
-            current_priority, current_vertex = open_vertices.pop()
+        while open_vertices.data:
+            current_priority, current_vertex = pop()
+            current_id = current_vertex.id
+            if current_priority > costs[current_id]:
+                continue  # stale entry, vertex was re-pushed with a lower cost
 
-            if current_vertex.id == end_id:
+            if current_id == end_id:
                 return self.build_path(old_vertices, begin_id, end_id)
 
+            current_dist = shortest[current_id]
             for neighbor_id, weight in current_vertex.adj.items():
-                possible_path = shortest[current_vertex.id] + weight
-                if possible_path < shortest[neighbor_id]:
-                    old_vertices[neighbor_id] = current_vertex.id
+                possible_path = current_dist + weight
+                if possible_path < shortest.get(neighbor_id, inf):
+                    old_vertices[neighbor_id] = (current_id, weight)
                     shortest[neighbor_id] = possible_path
-                    costs[neighbor_id] = shortest[neighbor_id] + metric(self.get_vertex_by_id(neighbor_id),
-                                                                         self.get_vertex_by_id(end_id))
-                    if not open_vertices.locator.get(neighbor_id):
-                        open_vertices.push(costs[neighbor_id], self.get_vertex_by_id(neighbor_id))
+                    neighbor = get(neighbor_id)
+                    if h_all is not None:
+                        cost = possible_path + h_all[neighbor.idx]
                     else:
-                        open_vertices.update(costs[neighbor_id], self.get_vertex_by_id(neighbor_id))
+                        h = h_cache.get(neighbor_id)
+                        if h is None:
+                            h = h_cache[neighbor_id] = heuristic(neighbor, end_vertex)
+                        cost = possible_path + h
+                    costs[neighbor_id] = cost
+                    push(cost, neighbor)
 
         return [], 0.0
 
+    def multi_source_dijkstra(self, begin_ids: Iterable[str], end_id: str) -> Tuple[List[str], float]:
+        """
+        Performs Dijkstra's algorithm from several start vertices at once to find the shortest path
+        from whichever start vertex is closest to the target vertex.
+        :param begin_ids: ids of the starting vertices; ids not in the graph are ignored.
+        :param end_id: id of the terminating vertex.
+        :return: ([path], distance): tuple where first element is a list of vertex IDs specifying a path from the
+        closest start vertex to end_id and second element is the sum of the weights of the edges along the path traveled
+        """
+        sources = [vertex_id for vertex_id in dict.fromkeys(begin_ids) if vertex_id in self.vertices]
+        if not sources or end_id not in self.vertices:
+            return [], 0.0
+
+        inf, get = math.inf, self.vertices.__getitem__
+        open_vertices = PriorityQueue()
+        open_vertices.push_batch((0, get(vertex_id)) for vertex_id in sources)
+        shortest = dict.fromkeys(sources, 0)
+        back_edges = {}
+
+        while not open_vertices.empty():
+            current_dist, current_vertex = open_vertices.pop()
+            current_id = current_vertex.id
+
+            if current_id == end_id:
+                begin_id = current_id
+                while begin_id in back_edges:
+                    begin_id = back_edges[begin_id][0]
+                return self.build_path(back_edges, begin_id, end_id)
+
+            for neighbor_id, weight in current_vertex.adj.items():
+                possible_path = current_dist + weight
+                if possible_path < shortest.get(neighbor_id, inf):
+                    shortest[neighbor_id] = possible_path
+                    back_edges[neighbor_id] = (current_id, weight)
+                    if neighbor_id in open_vertices.locator:
+                        open_vertices.update(possible_path, get(neighbor_id))
+                    else:
+                        open_vertices.push(possible_path, get(neighbor_id))
+
+        return [], 0.0
+
+    def bidirectional_dijkstra(self, begin_id: str, end_id: str) -> Tuple[List[str], float]:
+        """
+        Finds the shortest path from a start vertex to a target vertex by growing a forward search
+        from begin_id and a backward search (over incoming edges) from end_id until they meet.
+        :param begin_id: id of the starting vertex.
+        :param end_id: id of the terminating vertex.
+        :return: ([path], distance): tuple where first element is a list of vertex IDs specifying a path from begin_id to end_id
+        and second element is the sum of the weights of the edges along the path traveled
+        """
+        if begin_id not in self.vertices or end_id not in self.vertices:
+            return [], 0.0
+        if begin_id == end_id:
+            return [begin_id], 0
+
+        inf, reverse_adj = math.inf, self.get_reverse_adj()
+        dist_f, dist_b = {begin_id: 0}, {end_id: 0}
+        pred_f, pred_b = {}, {}
+        heap_f, heap_b = [(0, begin_id)], [(0, end_id)]
+        settled_f, settled_b = set(), set()
+        mu, meet_id = inf, None
+
+        while heap_f and heap_b:
+            if heap_f[0][0] + heap_b[0][0] >= mu:
+                break
+
+            # expand whichever frontier currently has the smaller tentative distance
+            forward = heap_f[0][0] <= heap_b[0][0]
+            if forward:
+                heap, dist, pred, settled, other_dist = heap_f, dist_f, pred_f, settled_f, dist_b
+            else:
+                heap, dist, pred, settled, other_dist = heap_b, dist_b, pred_b, settled_b, dist_f
+
+            current_dist, current_id = heapq.heappop(heap)
+            if current_id in settled:
+                continue
+            settled.add(current_id)
+
+            edges = self.vertices[current_id].adj.items() if forward else reverse_adj[current_id]
+            for next_id, weight in edges:
+                possible_path = current_dist + weight
+                if possible_path < dist.get(next_id, inf):
+                    dist[next_id] = possible_path
+                    pred[next_id] = current_id
+                    heapq.heappush(heap, (possible_path, next_id))
+                if next_id in other_dist and dist[next_id] + other_dist[next_id] < mu:
+                    mu = dist[next_id] + other_dist[next_id]
+                    meet_id = next_id
+
+        if meet_id is None:
+            return [], 0.0
+
+        path = [meet_id]
+        while path[-1] != begin_id:
+            path.append(pred_f[path[-1]])
+        path.reverse()
+        while path[-1] != end_id:
+            path.append(pred_b[path[-1]])
+        return path, mu
+
     def tollways_algorithm(self, start_id: str, target_id: str, coupons: int) -> Tuple[float, float] | Tuple[None, None]:
         """
         Finds the cheapest path from a start vertex to a target vertex in a graph where tolls can be reduced by using a limited number of coupons.
+        A coupon halves the toll of one edge, rounded down (weight // 2), so fractional tolls are floored too: 5 -> 2, 2.5 -> 1.0.
         :param start_id: id of the starting vertex.
         :param target_id: id of the terminating vertex.
         :param coupons: maximum number of coupons
@@ -438,63 +837,61 @@ class Graph:
         if start_id not in self.vertices or target_id not in self.vertices:
             return None, None
 
-        pq = TollWayPriorityQueue()
-        pq.push(0, 0, self.vertices[start_id])
-        costs = {(start_id, 0): 0}
+        self.get_vertex_index()  # ensures every vertex.idx is current
+        get = self.vertices.__getitem__
+        start = get(start_id)
 
-        while not pq.empty():
-            try:
-                current_cost, coupons_used, current_vertex = pq.pop()
-            except KeyError:
-                continue
+        # costs[v, k] is the cheapest known cost of reaching vertex index v having used k coupons
+        costs = np.full((self.size, max(coupons, 0) + 1), np.inf)
+        costs[start.idx, 0] = 0
+        pq = [(0, 0, start.idx, start)]  # heap of (cost, coupons_used, vertex index, vertex)
+
+        while pq:
+            current_cost, coupons_used, current, current_vertex = heapq.heappop(pq)
+            if current_cost > costs[current, coupons_used]:
+                continue  # stale entry, state was re-pushed with a lower cost
 
             if current_vertex.id == target_id:
                 return current_cost, coupons_used
 
             for neighbor_id, weight in current_vertex.adj.items():
+                neighbor = get(neighbor_id)
                 next_cost = current_cost + weight
-                if coupons_used < coupons:
-                    next_cost_coup = current_cost + (weight // 2)
-                else:
-                    next_cost_coup = current_cost + weight
-
-                if (neighbor_id, coupons_used) not in costs or next_cost < costs[(neighbor_id, coupons_used)]:
-                    pq.push(next_cost, coupons_used, self.vertices[neighbor_id])
-                    costs[(neighbor_id, coupons_used)] = next_cost
+                if next_cost < costs[neighbor.idx, coupons_used]:
+                    costs[neighbor.idx, coupons_used] = next_cost
+                    heapq.heappush(pq, (next_cost, coupons_used, neighbor.idx, neighbor))
 
                 if coupons_used < coupons:
-                    next_coup_used = coupons_used + 1
-                    if (neighbor_id, next_coup_used) not in costs or next_cost_coup < costs[(neighbor_id, next_coup_used)]:
-                        pq.push(next_cost_coup, next_coup_used, self.vertices[neighbor_id])
-                        costs[(neighbor_id, next_coup_used)] = next_cost_coup
+                    next_cost_coup = current_cost + (weight // 2)
+                    if next_cost_coup < costs[neighbor.idx, coupons_used + 1]:
+                        costs[neighbor.idx, coupons_used + 1] = next_cost_coup
+                        heapq.heappush(pq, (next_cost_coup, coupons_used + 1, neighbor.idx, neighbor))
 
         return None, None
 
 
 class PriorityQueue:
     """
-    Priority Queue built upon heapq module with support for priority key updates
+    Priority Queue built as an indexed binary heap with support for in-place priority key updates
     Created by Andrew McDonald
     Inspired by https://docs.python.org/2/library/heapq.html
     """
 
-    __slots__ = ['data', 'locator', 'counter']
+    __slots__ = ['data', 'locator']
 
     def __init__(self) -> None:
         """
             Construct an AStarPriorityQueue object
             """
-        self.data = []  # underlying data list of priority queue
-        self.locator = {}  # dictionary to locate vertices within priority queue
-        self.counter = itertools.count()  # used to break ties in prioritization
+        self.data = []  # binary heap of (priority, vertex) entries
+        self.locator = {}  # dictionary {vertex id: index of its entry in data}
 
     def __repr__(self) -> str:
         """
             Represent AStarPriorityQueue as a string
             :return: string representation of AStarPriorityQueue object
             """
-        lst = [f"[{priority}, {vertex}], " if vertex is not None else "" for
-               priority, count, vertex in self.data]
+        lst = [f"[{priority}, {vertex}], " for priority, vertex in self.data]
         return "".join(lst)[:-1]
 
     def __str__(self) -> str:
@@ -511,6 +908,44 @@ class PriorityQueue:
             """
         return len(self.data) == 0
 
+    def _sift_up(self, i: int) -> None:
+        """
+            Move the entry at index i towards the root until its parent has a smaller or equal priority
+            :param i: index into data of the entry to move
+            :return: None
+            """
+        data, locator = self.data, self.locator
+        entry = data[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not entry[0] < data[parent][0]:
+                break
+            data[i] = data[parent]
+            locator[data[i][1].id] = i
+            i = parent
+        data[i] = entry
+        locator[entry[1].id] = i
+
+    def _sift_down(self, i: int) -> None:
+        """
+            Move the entry at index i towards the leaves until both children have larger or equal priorities
+            :param i: index into data of the entry to move
+            :return: None
+            """
+        data, locator = self.data, self.locator
+        entry, size = data[i], len(data)
+        child = 2 * i + 1
+        while child < size:
+            if child + 1 < size and data[child + 1][0] < data[child][0]:
+                child += 1
+            if not data[child][0] < entry[0]:
+                break
+            data[i] = data[child]
+            locator[data[i][1].id] = i
+            i, child = child, 2 * child + 1
+        data[i] = entry
+        locator[entry[1].id] = i
+
     def push(self, priority: float, vertex: Vertex) -> None:
         """
             Push a vertex onto the priority queue with a given priority
@@ -518,10 +953,21 @@ class PriorityQueue:
             :param vertex: Vertex object to be stored in the priority queue
             :return: None
             """
-        # list is stored by reference, so updating will update all refs
-        node = [priority, next(self.counter), vertex]
-        self.locator[vertex.id] = node
-        heapq.heappush(self.data, node)
+        self.data.append((priority, vertex))
+        self._sift_up(len(self.data) - 1)
+
+    def push_batch(self, entries: Iterable[Tuple[float, Vertex]]) -> None:
+        """
+            Push many vertices at once, restoring heap order with a single O(n) bottom-up heapify
+            :param entries: iterable of (priority, vertex) pairs; vertices must not already be in the queue
+            :return: None
+            """
+        data, locator = self.data, self.locator
+        for priority, vertex in entries:
+            locator[vertex.id] = len(data)
+            data.append((priority, vertex))
+        for i in reversed(range(len(data) // 2)):
+            self._sift_down(i)
 
     def pop(self) -> Tuple[float, Vertex]:
         """
@@ -529,14 +975,14 @@ class PriorityQueue:
             :return: (priority, vertex) tuple where priority is key,
             and vertex is Vertex object stored in priority queue
             """
-        vertex = None
-        while vertex is None:
-            # keep popping until we have valid entry
-            priority, count, vertex = heapq.heappop(self.data)
+        data = self.data
+        priority, vertex = data[0]
+        last = data.pop()
         del self.locator[vertex.id]  # remove from locator dict
+        if data:
+            data[0] = last
+            self._sift_down(0)
         vertex.visited = True  # indicate that this vertex was visited
-        while len(self.data) > 0 and self.data[0][2] is None:
-            heapq.heappop(self.data)  # delete trailing Nones
         return priority, vertex
 
     def update(self, new_priority: float, vertex: Vertex) -> None:
@@ -546,15 +992,69 @@ class PriorityQueue:
             :param vertex: Vertex object for which priority is to be updated
             :return: None
             """
-        node = self.locator.pop(vertex.id)  # delete from dictionary
-        node[-1] = None  # invalidate old node
-        self.push(new_priority, vertex)  # push new node
+        i = self.locator[vertex.id]
+        self.data[i] = (new_priority, vertex)
+        self._sift_up(i)
+        self._sift_down(self.locator[vertex.id])
+
+
+class LazyPriorityQueue:
+    """
+    Push-only Priority Queue built upon heapq module
+    A vertex may be pushed several times; callers discard popped entries whose priority is out of date
+    """
+
+    __slots__ = ['data', 'counter']
+
+    def __init__(self) -> None:
+        """
+        Construct a LazyPriorityQueue object
+        """
+        self.data = []  # underlying data list of priority queue
+        self.counter = itertools.count()  # used to break ties in prioritization
+
+    def __repr__(self) -> str:
+        """
+        Represent LazyPriorityQueue as a string
+        :return: string representation of LazyPriorityQueue object
+        """
+        lst = [f"[{priority}, {vertex}], " for priority, count, vertex in self.data]
+        return "".join(lst)[:-1]
+
+    __str__ = __repr__
+
+    def empty(self) -> bool:
+        """
+        Determine whether priority queue is empty
+        :return: True if queue is empty, else false
+        """
+        return len(self.data) == 0
+
+    def push(self, priority: float, vertex: Vertex) -> None:
+        """
+        Push a vertex onto the priority queue with a given priority
+        :param priority: priority key upon which to order vertex
+        :param vertex: Vertex object to be stored in the priority queue
+        :return: None
+        """
+        heapq.heappush(self.data, (priority, next(self.counter), vertex))
+
+    def pop(self) -> Tuple[float, Vertex]:
+        """
+        Remove and return the (priority, vertex) tuple with lowest priority key
+        :return: (priority, vertex) tuple where priority is key,
+        and vertex is Vertex object stored in priority queue
+        """
+        priority, count, vertex = heapq.heappop(self.data)
+        vertex.visited = True  # indicate that this vertex was visited
+        return priority, vertex
 
 
 class TollWayPriorityQueue:
     """
     Priority Queue built upon heapq module with support for priority key updates
     Inspired by AStarPriorityQueue
+    No longer used by Graph.tollways_algorithm, which keeps its own heap of plain tuples; kept for existing callers
     """
 
     __slots__ = ['data', 'locator', 'counter']